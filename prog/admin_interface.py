@@ -3,18 +3,26 @@
 Admin Interface - Full System Management
 Complete interface for administrators to manage the voucher system
 """
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, request, jsonify, abort, send_from_directory
 from config import Config
 from database import (
     load_employees, get_birthday_today, create_voucher, 
-    redeem_voucher, generate_qr_code, get_all_vouchers,
-    get_voucher_history, get_system_stats, refresh_data
+    redeem_voucher, get_all_vouchers,
+    get_voucher_counts, get_voucher_history, iter_voucher_history,
+    get_system_stats, refresh_data, render_qr_png, store_qr_code,
+    file_signature, HISTORY_HEADER, db
 )
 from whatsapp_service import send_whatsapp_message
-import csv
+from json_provider import use_orjson
+from static_page import precompressed_page
+from datetime import date, datetime
+import os
 
 # ============= ADMIN FLASK APPLICATION =============
 app = Flask(__name__)
+use_orjson(app)
+# Voucher and history payloads grow with the CSV; skip sorting their keys
+app.json.sort_keys = False
 
 # Admin HTML template - Full management interface
 ADMIN_HTML_TEMPLATE = """
@@ -321,91 +329,99 @@ ADMIN_HTML_TEMPLATE = """
     </div>
 
     <script>
+        function renderStatus(data) {
+            document.getElementById('totalEmployees').textContent = data.employees_count;
+            document.getElementById('activeVouchers').textContent = data.vouchers_count;
+            document.getElementById('totalRedeemed').textContent = data.redeemed_count || 0;
+        }
+        
         function loadStatus() {
             fetch('/status')
             .then(res => res.json())
-            .then(data => {
-                document.getElementById('totalEmployees').textContent = data.employees_count;
-                document.getElementById('activeVouchers').textContent = data.vouchers_count;
-                document.getElementById('totalRedeemed').textContent = data.redeemed_count || 0;
-            })
+            .then(renderStatus)
             .catch(error => {
                 console.error('Error loading status:', error);
             });
         }
         
+        function renderEmployees(employees) {
+            let html = '';
+            employees.forEach(emp => {
+                html += `
+                    <div class="employee-item">
+                        <div class="employee-name">${emp.employee_name}</div>
+                        <div class="employee-phone">📞 ${emp.phone_number}</div>
+                        <div class="employee-phone">🆔 ${emp.employee_id}</div>
+                    </div>
+                `;
+            });
+            document.getElementById('employeeList').innerHTML = html;
+        }
+        
         function loadEmployees() {
             fetch('/employees')
             .then(res => res.json())
-            .then(data => {
-                let html = '';
-                data.employees.forEach(emp => {
-                    html += `
-                        <div class="employee-item">
-                            <div class="employee-name">${emp.employee_name}</div>
-                            <div class="employee-phone">📞 ${emp.phone_number}</div>
-                            <div class="employee-phone">🆔 ${emp.employee_id}</div>
-                        </div>
-                    `;
-                });
-                document.getElementById('employeeList').innerHTML = html;
-            })
+            .then(data => renderEmployees(data.employees))
             .catch(error => {
                 document.getElementById('employeeList').innerHTML = '<p>Error loading employees</p>';
             });
         }
         
+        function renderVouchers(vouchers) {
+            let html = '<div class="voucher-table"><table><tr><th>Code</th><th>Employee</th><th>Status</th><th>Created</th><th>Expires</th></tr>';
+            vouchers.forEach(voucher => {
+                const status = voucher.redeemed ? 
+                    '<span class="status-redeemed">Redeemed</span>' : 
+                    '<span class="status-created">Active</span>';
+                html += `
+                    <tr>
+                        <td>${voucher.qr_url ?
+                            `<a href="${voucher.qr_url}" target="_blank" class="voucher-code">${voucher.code}</a>` :
+                            `<span class="voucher-code">${voucher.code}</span>`}</td>
+                        <td>${voucher.employee_name}</td>
+                        <td>${status}</td>
+                        <td>${voucher.created_display}</td>
+                        <td>${voucher.expires_display}</td>
+                    </tr>
+                `;
+            });
+            html += '</table></div>';
+            document.getElementById('voucherStats').innerHTML = html;
+        }
+        
         function loadVouchers() {
             fetch('/vouchers')
             .then(res => res.json())
-            .then(data => {
-                let html = '<div class="voucher-table"><table><tr><th>Code</th><th>Employee</th><th>Status</th><th>Created</th><th>Expires</th></tr>';
-                data.vouchers.forEach(voucher => {
-                    const status = voucher.redeemed ? 
-                        '<span class="status-redeemed">Redeemed</span>' : 
-                        '<span class="status-created">Active</span>';
-                    const created = new Date(voucher.created_at).toLocaleString();
-                    const expires = new Date(voucher.expires_at).toLocaleString();
-                    html += `
-                        <tr>
-                            <td><span class="voucher-code">${voucher.code}</span></td>
-                            <td>${voucher.employee_name}</td>
-                            <td>${status}</td>
-                            <td>${created}</td>
-                            <td>${expires}</td>
-                        </tr>
-                    `;
-                });
-                html += '</table></div>';
-                document.getElementById('voucherStats').innerHTML = html;
-            })
+            .then(data => renderVouchers(data.vouchers))
             .catch(error => {
                 document.getElementById('voucherStats').innerHTML = '<p>Error loading vouchers</p>';
             });
         }
         
         
+        function renderHistory(history) {
+            let html = '<table><tr><th>Time</th><th>Code</th><th>Employee</th><th>Status</th></tr>';
+            history.forEach(record => {
+                const status = record.status === 'redeemed' ? 
+                    '<span class="status-redeemed">Redeemed</span>' : 
+                    '<span class="status-created">Created</span>';
+                html += `
+                    <tr>
+                        <td>${new Date(record.timestamp).toLocaleString()}</td>
+                        <td><span class="voucher-code">${record.voucher_code}</span></td>
+                        <td>${record.employee_name}</td>
+                        <td>${status}</td>
+                    </tr>
+                `;
+            });
+            html += '</table>';
+            document.getElementById('historyResult').innerHTML = html;
+        }
+        
         function loadHistory() {
             fetch('/history')
             .then(res => res.json())
-            .then(data => {
-                let html = '<table><tr><th>Time</th><th>Code</th><th>Employee</th><th>Status</th></tr>';
-                data.history.forEach(record => {
-                    const status = record.status === 'redeemed' ? 
-                        '<span class="status-redeemed">Redeemed</span>' : 
-                        '<span class="status-created">Created</span>';
-                    html += `
-                        <tr>
-                            <td>${new Date(record.timestamp).toLocaleString()}</td>
-                            <td><span class="voucher-code">${record.voucher_code}</span></td>
-                            <td>${record.employee_name}</td>
-                            <td>${status}</td>
-                        </tr>
-                    `;
-                });
-                html += '</table>';
-                document.getElementById('historyResult').innerHTML = html;
-            })
+            .then(data => renderHistory(data.history))
             .catch(error => {
                 document.getElementById('historyResult').innerHTML = '<p>Error loading history</p>';
             });
@@ -435,82 +451,240 @@ ADMIN_HTML_TEMPLATE = """
             element.style.display = 'block';
         }
         
-        // Load initial data
-        loadStatus();
-        loadEmployees();
-        loadVouchers();
-        loadHistory();
+        // Load initial data in one request, falling back to the individual endpoints
+        function loadAll() {
+            fetch('/bootstrap')
+            .then(res => res.json())
+            .then(data => {
+                renderStatus(data.status);
+                renderEmployees(data.employees);
+                renderVouchers(data.vouchers);
+                renderHistory(data.history);
+            })
+            .catch(error => {
+                console.error('Error loading dashboard:', error);
+                loadStatus();
+                loadEmployees();
+                loadVouchers();
+                loadHistory();
+            });
+        }
+        
+        loadAll();
     </script>
 </body>
 </html>
 """
 
-@app.route('/')
-def index():
-    """Admin dashboard"""
-    return render_template_string(ADMIN_HTML_TEMPLATE, 
-                                cafe_name=Config.CAFE_NAME, 
-                                cafe_location=Config.CAFE_LOCATION)
+# The dashboard only depends on Config, so render it once at import
+RENDERED_ADMIN_HTML = app.jinja_env.from_string(ADMIN_HTML_TEMPLATE).render(
+    cafe_name=Config.CAFE_NAME,
+    cafe_location=Config.CAFE_LOCATION
+)
+
+def signature_etag(path, *extra):
+    """ETag for data derived from a CSV file (changes on every write)"""
+    signature = file_signature(path)
+    if signature is None:
+        return None
+    return '-'.join(f"{part:x}" for part in signature + extra)
+
+def history_etag():
+    """ETag for data derived from the voucher history CSV"""
+    return signature_etag(Config.VOUCHER_HISTORY_CSV)
+
+def employees_etag():
+    """ETag for the employee list, whose birthday flags also change daily"""
+    return signature_etag(Config.EMPLOYEES_CSV, date.today().toordinal())
+
+def conditional_json(body, etag):
+    """JSON response tagged with etag, answered with 304 when the client already has it"""
+    response = Response(body, mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+# Admin dashboard
+app.add_url_rule('/', 'index', precompressed_page(RENDERED_ADMIN_HTML))
+
+# (key, stats, body) of the last /status response, see status_key()
+status_cache = (None, None, None)
+
+def status_key():
+    """Everything /status depends on: both CSV files and today's date"""
+    return (file_signature(Config.EMPLOYEES_CSV),
+            file_signature(Config.VOUCHER_HISTORY_CSV),
+            date.today())
+
+def cached_status():
+    """Return (stats, serialized stats), rebuilt only when a CSV or the date changes"""
+    global status_cache
+    
+    key = status_key()
+    cached_key, stats, body = status_cache
+    if cached_key != key:
+        # get_system_stats() already reloads the CSV files
+        stats = get_system_stats()
+        
+        # Redeemed count is maintained by the database, no need to scan vouchers
+        _, stats['redeemed_count'] = get_voucher_counts()
+        
+        body = app.json.dumps(stats) + '\n'
+        status_cache = (key, stats, body)
+    
+    return stats, body
+
+# (key, employees, body) of the last /employees response
+employees_cache = (None, None, None)
+
+def cached_employees():
+    """Return (employees, serialized response), rebuilt only when the CSV or the date changes"""
+    global employees_cache
+    
+    # Birthday flags only change with the employees CSV or the date
+    key = (file_signature(Config.EMPLOYEES_CSV), date.today())
+    cached_key, employees, body = employees_cache
+    if cached_key != key:
+        # load_employees() re-parses the CSV only when the file has changed
+        employees = load_employees()
+        birthdays = get_birthday_today()
+        birthday_ids = {emp['employee_id'] for emp in birthdays}
+        
+        for emp in employees:
+            emp['is_birthday'] = emp['employee_id'] in birthday_ids
+        
+        body = app.json.dumps({'employees': employees}) + '\n'
+        employees_cache = (key, employees, body)
+    
+    return employees, body
+
+def display_time(timestamp):
+    """Format an ISO timestamp for the dashboard tables"""
+    try:
+        return datetime.fromisoformat(timestamp).strftime('%Y-%m-%d %H:%M')
+    except (TypeError, ValueError):
+        return timestamp
+
+# (key, voucher_list, body) of the last /vouchers response
+vouchers_cache = (None, None, None)
+
+def cached_voucher_list():
+    """Return (voucher rows, serialized response), rebuilt only when the history CSV changes"""
+    global vouchers_cache
+    
+    key = file_signature(Config.VOUCHER_HISTORY_CSV)
+    cached_key, voucher_list, body = vouchers_cache
+    if key is None or cached_key != key:
+        # get_all_vouchers() reloads the voucher history itself
+        vouchers = get_all_vouchers()
+        voucher_list = []
+        
+        for code, voucher in vouchers.items():
+            voucher_list.append({
+                'code': code,
+                'employee_name': voucher['employee_name'],
+                'created_at': voucher['created_at'],
+                'expires_at': voucher['expires_at'],
+                # Formatted once here rather than parsed per row in the browser
+                'created_display': display_time(voucher['created_at']),
+                'expires_display': display_time(voucher['expires_at']),
+                'redeemed': voucher['redeemed'],
+                'qr_url': None if voucher['redeemed'] else f"/vouchers/{code}/qr.png"
+            })
+        
+        body = app.json.dumps({'vouchers': voucher_list}) + '\n'
+        vouchers_cache = (key, voucher_list, body)
+    
+    return voucher_list, body
 
 @app.route('/status')
 def status():
     """Get system status"""
-    refresh_data()  # Refresh data from CSV before getting stats
-    stats = get_system_stats()
-    vouchers = get_all_vouchers()
-    
-    # Count redeemed vouchers
-    redeemed_count = sum(1 for v in vouchers.values() if v['redeemed'])
-    stats['redeemed_count'] = redeemed_count
-    
-    return jsonify(stats)
+    # The dashboard polls this, so reuse the serialized stats
+    _, body = cached_status()
+    return Response(body, mimetype='application/json')
 
 @app.route('/employees')
 def employees():
     """Get employee list with birthday info"""
-    refresh_data()  # Refresh data from CSV
-    employees = load_employees()
-    birthdays = get_birthday_today()
-    birthday_ids = {emp['employee_id'] for emp in birthdays}
-    
-    for emp in employees:
-        emp['is_birthday'] = emp['employee_id'] in birthday_ids
-    
-    return jsonify({'employees': employees})
+    # Take the ETag first, so a write in between can't tag an older body as newer
+    etag = employees_etag()
+    _, body = cached_employees()
+    return conditional_json(body, etag)
 
 @app.route('/vouchers')
 def vouchers():
     """Get all vouchers"""
-    refresh_data()  # Refresh data from CSV
-    vouchers = get_all_vouchers()
-    voucher_list = []
+    # Vouchers only change when the history CSV is written, so let clients
+    # that already have this version skip the payload
+    etag = history_etag()
+    _, body = cached_voucher_list()
+    return conditional_json(body, etag)
+
+@app.route('/bootstrap')
+def bootstrap():
+    """Everything the dashboard shows on first load, in a single response"""
+    stats, _ = cached_status()
+    employees, _ = cached_employees()
+    voucher_list, _ = cached_voucher_list()
     
-    for code, voucher in vouchers.items():
-        voucher_list.append({
-            'code': code,
-            'employee_name': voucher['employee_name'],
-            'created_at': voucher['created_at'],
-            'expires_at': voucher['expires_at'],
-            'redeemed': voucher['redeemed']
-        })
+    return jsonify({
+        'status': stats,
+        'employees': employees,
+        'vouchers': voucher_list,
+        'history': get_voucher_history()
+    })
+
+@app.route('/vouchers/<voucher_code>/qr.png')
+def voucher_qr(voucher_code):
+    """Serve a voucher's QR code as a cacheable PNG"""
+    voucher = get_all_vouchers().get(voucher_code)
+    if not voucher or voucher['redeemed']:
+        abort(404)
     
-    return jsonify({'vouchers': voucher_list})
+    qr_filename = f"{voucher_code}.png"
+    if os.path.exists(os.path.join(Config.QRCODES_DIR, qr_filename)):
+        response = send_from_directory(Config.QRCODES_DIR, qr_filename, mimetype='image/png')
+    else:
+        # QR images are removed on redemption/expiry cleanup, so rebuild the file.
+        # generate_qr_code() can't be used here: on a cache hit it returns the
+        # data URI without writing the file again
+        png_bytes = render_qr_png(voucher_code)
+        store_qr_code(voucher_code, png_bytes)
+        response = Response(png_bytes, mimetype='image/png')
+    
+    # A voucher code always encodes to the same image
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response
+
 
+def stream_history():
+    """Yield the {"history": [...]} JSON body one CSV row at a time"""
+    yield '{"history":['
+    separator = ''
+    for row in iter_voucher_history():
+        yield separator + app.json.dumps(row)
+        separator = ','
+    yield ']}'
 
 @app.route('/history')
 def history():
     """Get voucher history"""
-    refresh_data()  # Refresh data from CSV before getting history
-    return jsonify({'history': get_voucher_history()})
+    # History is read straight from the CSV and streamed row by row, so a long
+    # history is never held in memory as one list or one JSON string.
+    # On a 304 the generator is never started
+    etag = history_etag()
+    return conditional_json(stream_history(), etag)
 
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
     """Clear voucher history"""
     try:
-        with open(Config.VOUCHER_HISTORY_CSV, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['timestamp', 'voucher_code', 'employee_id', 'employee_name', 'status']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
+        # Hold the database lock so a reload or redemption can't interleave
+        with db.lock:
+            with open(Config.VOUCHER_HISTORY_CSV, 'w', newline='', encoding='utf-8') as f:
+                f.write(HISTORY_HEADER)
         
         return jsonify({
             'success': True,
@@ -3,19 +3,28 @@
 BDVoucher - Birthday Voucher System
 Main Flask application
 """
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, request, jsonify
 from config import Config
 from database import (
-    load_employees, get_birthday_today, create_voucher, 
-    redeem_voucher, generate_qr_code, get_all_vouchers,
-    get_voucher_history, get_system_stats, refresh_data
+    load_employees, get_birthday_today, prepare_birthday_vouchers,
+    get_all_vouchers, get_voucher_history, get_system_stats, refresh_data
 )
-from whatsapp_service import send_whatsapp_message
+from whatsapp_service import send_whatsapp_messages
+from redemption import redemption
+from json_provider import use_orjson
+from static_page import precompressed_page
 from auto_messaging import start_auto_messaging, stop_auto_messaging, test_auto_messaging
 import csv
+import threading
+import uuid
+from datetime import date
 
 # ============= FLASK APPLICATION =============
 app = Flask(__name__)
+use_orjson(app)
+# Voucher and history payloads grow with the CSV; skip sorting their keys
+app.json.sort_keys = False
+app.register_blueprint(redemption)
 
 # Simple HTML template
 HTML_TEMPLATE = """
@@ -100,9 +109,48 @@ HTML_TEMPLATE = """
     <script>
         let video = document.getElementById('video');
         let canvas = document.getElementById('canvas');
-        let ctx = canvas.getContext('2d');
+        // Pixels are read back on every scanned frame, so keep the canvas in CPU memory
+        let ctx = canvas.getContext('2d', { willReadFrequently: true });
         let scanning = false;
         let stream = null;
+        
+        // Frames are decoded off the main thread, on a copy scaled down to this width.
+        // Vouchers are dark-on-light QR codes, so jsQR is told not to also try
+        // the inverted image (which would double the work per frame)
+        const SCAN_WIDTH = 320;
+        const QR_WORKER_SOURCE = `
+            importScripts('https://cdnjs.cloudflare.com/ajax/libs/jsQR/1.4.0/jsQR.min.js');
+            onmessage = function(e) {
+                const code = jsQR(e.data.data, e.data.width, e.data.height, { inversionAttempts: 'dontInvert' });
+                postMessage(code ? code.data : null);
+            };
+        `;
+        let qrWorker = null;
+        let decoding = false;
+        // A voucher held up to the camera only needs checking ~10 times a second
+        const SCAN_INTERVAL_MS = 100;
+
+        function createQRWorker() {
+            if (!window.Worker) return null;
+            try {
+                const source = new Blob([QR_WORKER_SOURCE], { type: 'text/javascript' });
+                const worker = new Worker(URL.createObjectURL(source));
+                worker.onmessage = function(e) {
+                    decoding = false;
+                    if (e.data) onQRCodeFound(e.data);
+                };
+                worker.onerror = function(err) {
+                    // Fall back to decoding on the main thread
+                    console.error('QR worker error:', err);
+                    worker.terminate();
+                    qrWorker = null;
+                    decoding = false;
+                };
+                return worker;
+            } catch (err) {
+                return null;
+            }
+        }
 
         function startCamera() {
             navigator.mediaDevices.getUserMedia({ 
@@ -119,6 +167,7 @@ HTML_TEMPLATE = """
                 document.getElementById('cameraBtn').style.display = 'none';
                 document.getElementById('stopBtn').style.display = 'inline-block';
                 scanning = true;
+                if (!qrWorker) qrWorker = createQRWorker();
                 scanQRCode();
             })
             .catch(function(err) {
@@ -138,27 +187,44 @@ HTML_TEMPLATE = """
             document.getElementById('stopBtn').style.display = 'none';
         }
 
+        function onQRCodeFound(data) {
+            if (!scanning) return;
+            console.log('QR Code detected:', data);
+            document.getElementById('voucherCode').value = data;
+            stopCamera();
+            redeemVoucher();
+        }
+
         function scanQRCode() {
             if (!scanning) return;
             
-            if (video.readyState === video.HAVE_ENOUGH_DATA) {
-                canvas.width = video.videoWidth;
-                canvas.height = video.videoHeight;
+            // Skip frames while the worker is still busy with the previous one
+            if (!decoding && video.readyState === video.HAVE_ENOUGH_DATA) {
+                // Resizing reallocates the canvas, so only do it when the video size changes
+                const scale = Math.min(1, SCAN_WIDTH / video.videoWidth);
+                const width = Math.round(video.videoWidth * scale);
+                const height = Math.round(video.videoHeight * scale);
+                if (canvas.width !== width || canvas.height !== height) {
+                    canvas.width = width;
+                    canvas.height = height;
+                }
                 ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
                 
                 const imageData = ctx.getImageData(0, 0, canvas.width, canvas.height);
-                const code = jsQR(imageData.data, imageData.width, imageData.height);
-                
-                if (code) {
-                    console.log('QR Code detected:', code.data);
-                    document.getElementById('voucherCode').value = code.data;
-                    stopCamera();
-                    redeemVoucher();
-                    return;
+                if (qrWorker) {
+                    // Transfer the pixel buffer to the worker instead of copying it
+                    decoding = true;
+                    qrWorker.postMessage(imageData, [imageData.data.buffer]);
+                } else {
+                    const code = jsQR(imageData.data, imageData.width, imageData.height, { inversionAttempts: 'dontInvert' });
+                    if (code) {
+                        onQRCodeFound(code.data);
+                        return;
+                    }
                 }
             }
             
-            requestAnimationFrame(scanQRCode);
+            setTimeout(() => requestAnimationFrame(scanQRCode), SCAN_INTERVAL_MS);
         }
 
         function redeemVoucher() {
@@ -233,46 +299,67 @@ HTML_TEMPLATE = """
 </html>
 """
 
-@app.route('/')
-def index():
-    """Main page"""
-    return render_template_string(HTML_TEMPLATE, 
-                                cafe_name=Config.CAFE_NAME, 
-                                cafe_location=Config.CAFE_LOCATION)
-
-@app.route('/redeem', methods=['POST'])
-def redeem():
-    """Redeem a voucher"""
-    data = request.json
-    code = data.get('code', '')
-    
-    success, result = redeem_voucher(code)
-    
-    if success:
-        return jsonify({
-            'success': True,
-            'employee_name': result['employee_name'],
-            'message': 'Voucher redeemed successfully!'
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'message': result
-        })
+# The page only depends on Config values, so render it once at import
+RENDERED_HTML = app.jinja_env.from_string(HTML_TEMPLATE).render(
+    cafe_name=Config.CAFE_NAME,
+    cafe_location=Config.CAFE_LOCATION
+)
 
+# Main page
+app.add_url_rule('/', 'index', precompressed_page(RENDERED_HTML))
 
 @app.route('/status')
 def status():
     """Get system status"""
-    refresh_data()  # Refresh data from CSV before getting stats
+    # get_system_stats() already reloads the CSV files
     return jsonify(get_system_stats())
 
 @app.route('/history')
 def history():
     """Get voucher history"""
-    refresh_data()  # Refresh data from CSV before getting history
+    # History is read straight from the CSV, no cache refresh needed
     return jsonify({'history': get_voucher_history()})
 
+def process_birthdays(birthdays):
+    """Create vouchers and send birthday wishes, yielding one result per employee"""
+    created, failed = prepare_birthday_vouchers(birthdays)
+    for employee, error in failed:
+        yield {
+            'employee_name': employee['employee_name'],
+            'error': str(error)
+        }
+    
+    # Send WhatsApp messages in parallel, reporting each as it finishes
+    recipients = [(employee['phone_number'], employee['employee_name'], voucher_code)
+                  for employee, voucher_code in created]
+    for (_, employee_name, voucher_code), success in send_whatsapp_messages(recipients):
+        yield {
+            'employee_name': employee_name,
+            'voucher_code': voucher_code,
+            'message_sent': success
+        }
+
+# Background /send-birthday jobs by ID, oldest first
+birthday_jobs = {}
+# Guards birthday_jobs, so two requests can't both start a job for the same day
+birthday_jobs_lock = threading.Lock()
+# Number of background jobs kept for status polling
+BIRTHDAY_JOBS_KEPT = 20
+
+def run_birthday_job(job, birthdays):
+    """Process birthdays in the background, recording results as they arrive"""
+    try:
+        for result in process_birthdays(birthdays):
+            job['results'].append(result)
+    except Exception as e:
+        job['error'] = str(e)
+    finally:
+        job['done'] = True
+
+def query_flag(name):
+    """True only for an explicit ?name=1/true/yes, so ?name=0 or ?name=false stay off"""
+    return request.args.get(name, '').strip().lower() in ('1', 'true', 'yes')
+
 @app.route('/send-birthday', methods=['POST'])
 def send_birthday():
     """Send birthday wishes to employees with birthdays today"""
@@ -285,38 +372,45 @@ def send_birthday():
                 'message': 'No birthdays today'
             })
         
-        results = []
-        for employee in birthdays:
-            try:
-                # Create voucher
-                voucher_code = create_voucher(employee['employee_id'], employee['employee_name'])
+        # With ?background=1, return a job ID right away and let the client
+        # poll /send-birthday/status/<job_id> for progress
+        if query_flag('background'):
+            today = date.today().isoformat()
+            with birthday_jobs_lock:
+                # A repeated POST joins today's job instead of sending everything twice
+                for job_id, job in birthday_jobs.items():
+                    if job['day'] == today and not job['done']:
+                        return jsonify({
+                            'success': True,
+                            'message': f"Already processing {job['total']} birthdays",
+                            'job_id': job_id
+                        })
                 
-                # Generate QR code
-                qr_code = generate_qr_code(voucher_code)
+                job_id = uuid.uuid4().hex
+                job = {'day': today, 'done': False, 'total': len(birthdays),
+                       'results': [], 'error': None}
+                birthday_jobs[job_id] = job
+                while len(birthday_jobs) > BIRTHDAY_JOBS_KEPT:
+                    birthday_jobs.pop(next(iter(birthday_jobs)))
                 
-                # Send WhatsApp message
-                success = send_whatsapp_message(
-                    employee['phone_number'],
-                    employee['employee_name'],
-                    voucher_code
-                )
-                
-                results.append({
-                    'employee_name': employee['employee_name'],
-                    'voucher_code': voucher_code,
-                    'message_sent': success
-                })
-                
-            except Exception as e:
-                results.append({
-                    'employee_name': employee['employee_name'],
-                    'error': str(e)
-                })
+                threading.Thread(target=run_birthday_job, args=(job, birthdays), daemon=True).start()
+            return jsonify({
+                'success': True,
+                'message': f'Processing {len(birthdays)} birthdays',
+                'job_id': job_id
+            })
+        
+        # With ?stream=1, send each result as an NDJSON line as soon as it is ready
+        if query_flag('stream'):
+            def generate():
+                for result in process_birthdays(birthdays):
+                    yield app.json.dumps(result) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
         
         return jsonify({
             'success': True,
             'message': f'Processed {len(birthdays)} birthdays',
-            'results': results
+            'results': list(process_birthdays(birthdays))
         })
         
     except Exception as e:
@@ -325,6 +419,24 @@ def send_birthday():
             'message': f'Error: {str(e)}'
         })
 
+@app.route('/send-birthday/status/<job_id>')
+def send_birthday_status(job_id):
+    """Get progress of a background /send-birthday job"""
+    job = birthday_jobs.get(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': job['error'] is None,
+        'done': job['done'],
+        'total': job['total'],
+        'results': list(job['results']),
+        'error': job['error']
+    })
+
 @app.route('/test-auto-messaging', methods=['POST'])
 def test_auto_messaging_endpoint():
     """Test automatic messaging system"""
@@ -4,14 +4,16 @@ BDVoucher - Automatic Birthday Messaging Scheduler
 Runs in background to send birthday messages at configured time
 """
 import schedule
-import time
 import threading
 from datetime import datetime
 import pytz
 from config import Config
-from database import get_birthday_today, create_voucher, generate_qr_code
+from database import get_birthday_today, prepare_birthday_vouchers
 from whatsapp_service import send_whatsapp_message
 
+# Longest the scheduler sleeps before re-checking, in case the clock jumps
+MAX_IDLE_SECONDS = 3600
+
 
 class AutoMessagingScheduler:
     """Automatic birthday messaging scheduler"""
@@ -19,11 +21,13 @@ class AutoMessagingScheduler:
     def __init__(self):
         self.running = False
         self.scheduler_thread = None
+        self.stop_event = threading.Event()
+        self.timezone = pytz.timezone(Config.AUTO_MESSAGING_TIMEZONE)
         
     def send_birthday_messages(self):
         """Send birthday messages to employees with birthdays today"""
         try:
-            now = datetime.now(pytz.timezone(Config.AUTO_MESSAGING_TIMEZONE))
+            now = datetime.now(self.timezone)
             print(f"[AUTO-MSG] Checking for birthdays at {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
             
             # Get employees with birthdays today
@@ -33,19 +37,16 @@ class AutoMessagingScheduler:
                 print("[AUTO-MSG] No birthdays today")
                 return
             
-            print(f"[AUTO-MSG] Found {len(birthdays)} birthdays today")
+            total = len(birthdays)
+            print(f"[AUTO-MSG] Found {total} birthdays today")
+            
+            created, _ = prepare_birthday_vouchers(birthdays)
+            print(f"[AUTO-MSG] Created {len(created)} vouchers")
             
-            for i, employee in enumerate(birthdays, start=1):
+            for i, (employee, voucher_code) in enumerate(created, start=1):
                 try:
-                    print(f"\n[AUTO-MSG] Processing {i}/{len(birthdays)}: {employee['employee_name']}")
-
-                    # Create voucher
-                    voucher_code = create_voucher(employee['employee_id'], employee['employee_name'])
-                    print(f"[AUTO-MSG] Created voucher {voucher_code} for {employee['employee_name']}")
-                    
-                    # Generate QR code
-                    qr_code = generate_qr_code(voucher_code)
-                    print(f"[AUTO-MSG] Generated QR code for {employee['employee_name']}")
+                    employee_name = employee['employee_name']
+                    print(f"\n[AUTO-MSG] Processing {i}/{len(created)}: {employee_name} ({voucher_code})")
                     
                     # Format message
                     message = self.format_birthday_message(employee, voucher_code)
@@ -53,20 +54,15 @@ class AutoMessagingScheduler:
                     # Send WhatsApp message
                     success = send_whatsapp_message(
                         employee['phone_number'],
-                        employee['employee_name'],
+                        employee_name,
                         voucher_code,
                         custom_message=message
                     )
                     
                     if success:
-                        print(f"[AUTO-MSG ✅] Birthday message sent to {employee['employee_name']}")
+                        print(f"[AUTO-MSG ✅] Birthday message sent to {employee_name}")
                     else:
-                        print(f"[AUTO-MSG ⚠️] Failed to send message to {employee['employee_name']}")
-                    
-                    # Add a 10-second delay only for TextMeBot
-                    if Config.MESSAGING_SERVICE.lower() == 'textmebot':
-                        print("[AUTO-MSG] Waiting 10 seconds before sending the next message...")
-                        time.sleep(10)
+                        print(f"[AUTO-MSG ⚠️] Failed to send message to {employee_name}")
                         
                 except Exception as e:
                     print(f"[AUTO-MSG ❌] Error processing {employee['employee_name']}: {e}")
@@ -79,11 +75,7 @@ class AutoMessagingScheduler:
         try:
             message = Config.BIRTHDAY_MESSAGE_TEMPLATE.format(
                 employee_name=employee['employee_name'],
-                cafe_name=Config.CAFE_NAME,
-                cafe_location=Config.CAFE_LOCATION,
-                voucher_reward=Config.VOUCHER_REWARD,
-                voucher_value=Config.VOUCHER_VALUE,
-                validity_period=Config.get_validity_period_text()
+                **Config.BIRTHDAY_MESSAGE_FIELDS
             )
             return message
         except Exception as e:
@@ -106,9 +98,16 @@ class AutoMessagingScheduler:
         schedule.every().day.at(f"{hour:02d}:{minute:02d}").do(self.send_birthday_messages)
         print(f"[AUTO-MSG] Scheduled birthday messages for {Config.AUTO_MESSAGING_TIME} {Config.AUTO_MESSAGING_TIMEZONE}")
         
+        # Sleep until the next job is due instead of polling every minute;
+        # stop() sets stop_event to wake the wait immediately
         while self.running:
+            idle = schedule.idle_seconds()
+            if idle is None:
+                break
+            if idle > 0:
+                self.stop_event.wait(min(idle, MAX_IDLE_SECONDS))
+                continue
             schedule.run_pending()
-            time.sleep(60)
     
     def start(self):
         """Start the automatic messaging scheduler"""
@@ -121,6 +120,7 @@ class AutoMessagingScheduler:
             return
             
         self.running = True
+        self.stop_event.clear()
         self.scheduler_thread = threading.Thread(target=self.schedule_messages, daemon=True)
         self.scheduler_thread.start()
         print("[AUTO-MSG] Automatic messaging scheduler started")
@@ -128,6 +128,7 @@ class AutoMessagingScheduler:
     def stop(self):
         """Stop the automatic messaging scheduler"""
         self.running = False
+        self.stop_event.set()
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=5)
         print("[AUTO-MSG] Automatic messaging scheduler stopped")
@@ -3,9 +3,10 @@
 Cafe Interface for BDVoucher - Improved UI with In-Page Camera
 Chill birthday design, mobile compatible, auto-scan on upload
 """
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, request, jsonify
 from config import Config
-from database import redeem_voucher
+from redemption import redemption
+from json_provider import use_orjson
 import cv2
 import threading
 import time
@@ -17,15 +18,28 @@ import base64
 from io import BytesIO
 
 app = Flask(__name__)
+use_orjson(app)
+app.register_blueprint(redemption)
 
 # Global variables for camera
 camera = None
 scanner_active = False
 scanner_result = None
 scanner_error = None
+# Set whenever a camera scan ends (code found, error, timeout or stopped)
+scanner_done = threading.Event()
+
+# Longest a /camera-scan-stream request waits before reporting the current state
+CAMERA_SCAN_STREAM_TIMEOUT = 35
+
+# Camera frames are scaled down to this many pixels on their long side before decoding
+SCAN_FRAME_SIZE = 640
+
+# Only every Nth camera frame is decoded (about 10 per second from a 30 FPS feed)
+SCAN_FRAME_STEP = 3
 
 # Allowed file extensions for image upload
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp'})
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -486,6 +500,7 @@ CAFE_HTML_TEMPLATE = """
         let scanning = false;
         let countdownTimer = null;
         let videoStream = null;
+        let scanEvents = null;
 
         function startCameraScan() {
             if (scanning) return;
@@ -509,7 +524,7 @@ CAFE_HTML_TEMPLATE = """
             .then(data => {
                 if (data.success) {
                     startCountdown();
-                    pollCameraScan();
+                    watchCameraScan();
                 } else {
                     showResult('Failed to start camera scan: ' + data.message, 'error');
                     stopCameraScan();
@@ -540,6 +555,7 @@ CAFE_HTML_TEMPLATE = """
             if (!scanning) return;
             
             scanning = false;
+            closeCameraScanEvents();
             
             // Stop in-page camera
             if (videoStream) {
@@ -597,34 +613,65 @@ CAFE_HTML_TEMPLATE = """
             }, 1000);
         }
 
+        function watchCameraScan() {
+            // The server pushes a single event when the scan ends, so there is
+            // nothing to poll; fall back to polling without EventSource support
+            if (!window.EventSource) {
+                pollCameraScan();
+                return;
+            }
+            
+            scanEvents = new EventSource('/camera-scan-stream');
+            scanEvents.onmessage = function(event) {
+                const data = JSON.parse(event.data);
+                // Still scanning when the stream timed out; EventSource reconnects
+                if (data.active) return;
+                closeCameraScanEvents();
+                if (scanning) handleCameraScanStatus(data);
+            };
+        }
+
+        function closeCameraScanEvents() {
+            if (scanEvents) {
+                scanEvents.close();
+                scanEvents = null;
+            }
+        }
+
+        function handleCameraScanStatus(data) {
+            if (data.detected) {
+                console.log('QR code detected:', data.result);
+                stopCameraScan();
+                validateVoucher(data.result);
+            } else if (data.error) {
+                console.log('Camera scan error:', data.error);
+                showFullScreenResult('Error', 'Camera scan error: ' + data.error, 'error');
+                stopCameraScan();
+            } else {
+                console.log('Scanner not active, stopping');
+                scanning = false;
+                document.getElementById('cameraBtn').style.display = 'inline-block';
+                document.getElementById('stopCameraBtn').style.display = 'none';
+                document.getElementById('cameraContainer').style.display = 'none';
+                document.getElementById('cameraStatus').style.display = 'none';
+                document.getElementById('cameraPreview').style.display = 'none';
+                showResult('Camera scan completed.', 'info');
+                setTimeout(() => {
+                    clearForm();
+                }, 2000);
+            }
+        }
+
         function pollCameraScan() {
             if (!scanning) return;
             
             fetch('/check-camera-scan')
             .then(res => res.json())
             .then(data => {
-                if (data.detected) {
-                    console.log('QR code detected:', data.result);
-                    stopCameraScan();
-                    validateVoucher(data.result);
-                } else if (data.error) {
-                    console.log('Camera scan error:', data.error);
-                    showFullScreenResult('Error', 'Camera scan error: ' + data.error, 'error');
-                    stopCameraScan();
-                } else if (data.active) {
+                if (data.active) {
                     setTimeout(pollCameraScan, 1000);
                 } else {
-                    console.log('Scanner not active, stopping polling');
-                    scanning = false;
-                    document.getElementById('cameraBtn').style.display = 'inline-block';
-                    document.getElementById('stopCameraBtn').style.display = 'none';
-                    document.getElementById('cameraContainer').style.display = 'none';
-                    document.getElementById('cameraStatus').style.display = 'none';
-                    document.getElementById('cameraPreview').style.display = 'none';
-                    showResult('Camera scan completed.', 'info');
-                    setTimeout(() => {
-                        clearForm();
-                    }, 2000);
+                    handleCameraScanStatus(data);
                 }
             })
             .catch(error => {
@@ -778,12 +825,17 @@ CAFE_HTML_TEMPLATE = """
 </html>
 """
 
+# The page only depends on Config values, so compile and render it once at
+# import instead of re-parsing the template on every request
+RENDERED_CAFE_HTML = app.jinja_env.from_string(CAFE_HTML_TEMPLATE).render(
+    cafe_name=Config.CAFE_NAME,
+    cafe_location=Config.CAFE_LOCATION
+)
+
 @app.route('/')
 def index():
     """Cafe redemption page"""
-    return render_template_string(CAFE_HTML_TEMPLATE, 
-                                cafe_name=Config.CAFE_NAME, 
-                                cafe_location=Config.CAFE_LOCATION)
+    return RENDERED_CAFE_HTML
 
 @app.route('/start-camera-scan', methods=['POST'])
 def start_camera_scan():
@@ -794,6 +846,7 @@ def start_camera_scan():
         return jsonify({'success': False, 'message': 'Camera scan already running'})
     
     try:
+        scanner_done.clear()
         scanner_active = True
         scanner_result = None
         scanner_error = None
@@ -816,6 +869,7 @@ def stop_camera_scan():
     scanner_active = False
     scanner_result = None
     scanner_error = None
+    scanner_done.set()
     
     if camera:
         camera.release()
@@ -823,31 +877,46 @@ def stop_camera_scan():
     
     return jsonify({'success': True, 'message': 'Camera scan stopped'})
 
-@app.route('/check-camera-scan')
-def check_camera_scan():
-    """Check camera scan status and return any detected codes"""
-    global scanner_active, scanner_result, scanner_error
+def camera_scan_status():
+    """Current camera scan state, handing out a detected code only once"""
+    global scanner_result
     
     if scanner_error:
-        return jsonify({
+        return {
             'active': False,
             'detected': False,
             'error': scanner_error
-        })
+        }
     
     if scanner_result:
         result = scanner_result
         scanner_result = None  # Clear the result
-        return jsonify({
+        return {
             'active': False,
             'detected': True,
             'result': result
-        })
+        }
     
-    return jsonify({
+    return {
         'active': scanner_active,
         'detected': False
-    })
+    }
+
+@app.route('/check-camera-scan')
+def check_camera_scan():
+    """Check camera scan status and return any detected codes"""
+    return jsonify(camera_scan_status())
+
+@app.route('/camera-scan-stream')
+def camera_scan_stream():
+    """Push the camera scan outcome to the page as a Server-Sent Event"""
+    def events():
+        # Sleep until the scan thread finishes instead of being polled every second
+        scanner_done.wait(CAMERA_SCAN_STREAM_TIMEOUT)
+        yield f"data: {app.json.dumps(camera_scan_status())}\n\n"
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
 
 @app.route('/scan-image', methods=['POST'])
 def scan_image():
@@ -903,6 +972,13 @@ def camera_scan_thread():
             scanner_error = "Could not access camera"
             scanner_active = False
             return
+        
+        # Keep only the newest frame queued so we decode what is in front of
+        # the camera now, and ask for MJPG so USB webcams can deliver 30 FPS
+        # (backends that don't support a property just ignore it)
+        camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        camera.set(cv2.CAP_PROP_FPS, 30)
 
         detected = set()
         start_time = time.time()
@@ -915,30 +991,39 @@ def camera_scan_thread():
             if current_time - start_time >= timeout:
                 break
             
+            # grab() advances past the skipped frames without decoding them
+            for _ in range(SCAN_FRAME_STEP - 1):
+                camera.grab()
             ret, frame = camera.read()
             if not ret:
                 break
 
-            # Detect and decode QR codes
-            decoded_objects = decode(frame)
+            # Detect and decode QR codes on a small grayscale copy; zbar's cost
+            # grows with the pixel count and the full frame is only for display
+            height, width = frame.shape[:2]
+            scale = min(1.0, SCAN_FRAME_SIZE / max(height, width))
+            scan_frame = frame
+            if scale < 1.0:
+                scan_frame = cv2.resize(frame, None, fx=scale, fy=scale,
+                                        interpolation=cv2.INTER_AREA)
+            decoded_objects = decode(cv2.cvtColor(scan_frame, cv2.COLOR_BGR2GRAY))
             
             for obj in decoded_objects:
                 qr_data = obj.data.decode("utf-8")
-                points = obj.polygon
+                # Map the polygon back onto the full-size frame
+                points = [(int(point.x / scale), int(point.y / scale)) for point in obj.polygon]
 
                 # Draw bounding box
                 if len(points) > 4:
-                    hull = cv2.convexHull(points)
-                    points = hull
+                    hull = cv2.convexHull(np.array(points, dtype=np.int32))
+                    points = [(int(x), int(y)) for x, y in hull.reshape(-1, 2)]
 
                 n = len(points)
                 for j in range(n):
-                    pt1 = (points[j].x, points[j].y)
-                    pt2 = (points[(j + 1) % n].x, points[(j + 1) % n].y)
-                    cv2.line(frame, pt1, pt2, (0, 255, 0), 3)
+                    cv2.line(frame, points[j], points[(j + 1) % n], (0, 255, 0), 3)
 
                 # Display text
-                cv2.putText(frame, qr_data, (points[0].x, points[0].y - 10),
+                cv2.putText(frame, qr_data, (points[0][0], points[0][1] - 10),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
                 
                 if qr_data not in detected:
@@ -960,31 +1045,12 @@ def camera_scan_thread():
         scanner_error = str(e)
     finally:
         scanner_active = False
+        scanner_done.set()
         if camera:
             camera.release()
             camera = None
         cv2.destroyAllWindows()
 
-@app.route('/redeem', methods=['POST'])
-def redeem():
-    """Redeem a voucher"""
-    data = request.json
-    code = data.get('code', '')
-    
-    success, result = redeem_voucher(code)
-    
-    if success:
-        return jsonify({
-            'success': True,
-            'employee_name': result['employee_name'],
-            'message': 'Voucher redeemed successfully!'
-        })
-    else:
-        return jsonify({
-            'success': False,
-            'message': result
-        })
-
 if __name__ == '__main__':
     print(f"Starting {Config.CAFE_NAME} Cafe Interface (Improved UI & In-Page Camera)...")
     print(f"Cafe Interface: http://localhost:{Config.CAFE_PORT}")
@@ -31,6 +31,7 @@ class Config:
     ULTRAMSG_INSTANCE_ID = os.getenv('ULTRAMSG_INSTANCE_ID', '')
     ULTRAMSG_TOKEN = os.getenv('ULTRAMSG_TOKEN', '')
     TEXTMEBOT_KEY = os.getenv('TEXTMEBOT_KEY', '')
+    TEXTMEBOT_SEND_INTERVAL = float(os.getenv('TEXTMEBOT_SEND_INTERVAL', 10))  # seconds between sends
     
     # Automatic messaging settings
     AUTO_MESSAGING_ENABLED = os.getenv('AUTO_MESSAGING_ENABLED', 'True').lower() == 'true'
@@ -81,3 +82,13 @@ class Config:
                     return f"{days} days"
                 else:
                     return f"{days} days and {hours} hours"
+
+# Everything in the birthday message except the employee name is fixed at
+# startup, so build those template fields once
+Config.BIRTHDAY_MESSAGE_FIELDS = {
+    'cafe_name': Config.CAFE_NAME,
+    'cafe_location': Config.CAFE_LOCATION,
+    'voucher_reward': Config.VOUCHER_REWARD,
+    'voucher_value': Config.VOUCHER_VALUE,
+    'validity_period': Config.get_validity_period_text()
+}
@@ -7,18 +7,59 @@ import csv
 import os
 import secrets
 import string
+import threading
 from datetime import datetime, timedelta
 import base64
-import qrcode
-from io import BytesIO
+from io import BytesIO, StringIO
 from config import Config
 
+# Maximum number of QR code data URIs kept in memory
+QR_CACHE_SIZE = 4096
+
+# Header row of the voucher history CSV, written as-is when creating or clearing it
+HISTORY_HEADER = 'timestamp,voucher_code,employee_id,employee_name,status\r\n'
+
+# Read buffer for the voucher history CSV, which only ever grows
+HISTORY_READ_BUFFER = 1024 * 1024
+
+# Voucher codes are always 12 uppercase alphanumeric characters
+VOUCHER_CODE_LENGTH = 12
+
+def is_voucher_code(value):
+    """Cheap format check, so malformed codes never reach the history CSV"""
+    return (isinstance(value, str) and len(value) == VOUCHER_CODE_LENGTH
+            and value.isascii() and value.isalnum())
+
+def file_signature(path):
+    """Return (mtime, size) for a file, or None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def render_qr_png(voucher_code):
+    """Render a voucher QR code to PNG bytes"""
+    from qr_system import build_qr_image
+    
+    buffered = BytesIO()
+    build_qr_image(voucher_code).save(buffered, format="PNG")
+    return buffered.getvalue()
+
 class VoucherDatabase:
     """Centralized database interface for voucher operations"""
     
     def __init__(self):
-        self.vouchers_db = {}
+        # Request threads and background jobs share this instance. Loading,
+        # creating and redeeming call each other, so the lock is re-entrant
+        self.lock = threading.RLock()
         self.employees_cache = []
+        self.employees_signature = None
+        self.vouchers_signature = None
+        self.reset_vouchers()
+        self.birthdays_by_day = {}
+        self.employees_by_id = {}
+        self.qr_cache = {}
         self.load_all_data()
     
     def load_all_data(self):
@@ -27,8 +68,13 @@ class VoucherDatabase:
         self.load_vouchers_from_csv()
     
     def load_employees(self):
-        """Load employees from CSV"""
+        """Load employees from CSV (skipped when the file has not changed)"""
+        signature = file_signature(Config.EMPLOYEES_CSV)
+        if signature is not None and signature == self.employees_signature:
+            return self.employees_cache
+        
         self.employees_cache = []
+        self.employees_signature = signature
         try:
             with open(Config.EMPLOYEES_CSV, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
@@ -38,49 +84,20 @@ class VoucherDatabase:
             pass
         except Exception as e:
             print(f"Error loading employees: {e}")
-        return self.employees_cache
-    
-    def load_vouchers_from_csv(self):
-        """Load vouchers from voucher history CSV file"""
-        self.vouchers_db = {}
+            self.employees_signature = None
+        
+        self.index_birthdays()
+        
+        # Keep the first row for each ID, as the old linear scan did
+        self.employees_by_id = {}
+        for employee in self.employees_cache:
+            self.employees_by_id.setdefault(employee.get('employee_id'), employee)
         
-        try:
-            with open(Config.VOUCHER_HISTORY_CSV, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    voucher_code = row['voucher_code']
-                    status = row['status']
-                    
-                    if status == 'created':
-                        # Create voucher entry from creation record
-                        created_at = datetime.fromisoformat(row['timestamp'])
-                        expires_at = created_at + timedelta(hours=Config.get_voucher_validity_hours())
-                        
-                        self.vouchers_db[voucher_code] = {
-                            'employee_id': row['employee_id'],
-                            'employee_name': row['employee_name'],
-                            'created_at': row['timestamp'],
-                            'expires_at': expires_at.isoformat(),
-                            'redeemed': False,
-                            'redeemed_at': None
-                        }
-                    elif status == 'redeemed' and voucher_code in self.vouchers_db:
-                        # Update redemption status
-                        self.vouchers_db[voucher_code]['redeemed'] = True
-                        self.vouchers_db[voucher_code]['redeemed_at'] = row['timestamp']
-        except FileNotFoundError:
-            pass
-        except Exception as e:
-            print(f"Error loading vouchers: {e}")
-    
-    def get_employees(self):
-        """Get all employees"""
         return self.employees_cache
     
-    def get_birthday_today(self):
-        """Get employees with birthday today"""
-        today = datetime.now()
-        birthdays = []
+    def index_birthdays(self):
+        """Index employees by birthday month and day (MM-DD)"""
+        self.birthdays_by_day = {}
         
         for employee in self.employees_cache:
             try:
@@ -96,14 +113,142 @@ class VoucherDatabase:
                 else:
                     # Month-Day: MM-DD
                     birthday = datetime.strptime(birthday_str, '%m-%d')
-                    birthday = birthday.replace(year=today.year)
                 
-                if birthday.month == today.month and birthday.day == today.day:
-                    birthdays.append(employee)
+                day_key = f"{birthday.month:02d}-{birthday.day:02d}"
+                self.birthdays_by_day.setdefault(day_key, []).append(employee)
             except ValueError:
                 continue
-        
-        return birthdays
+    
+    def reset_vouchers(self):
+        """Forget the parsed history so the next load reads the CSV from the start"""
+        self.vouchers_db = {}
+        self.redeemed_count = 0
+        self.history_fields = None
+        self.history_offset = 0
+        self.history_last_row = b''
+    
+    def load_vouchers_from_csv(self):
+        """Load vouchers from voucher history CSV file (only reading rows added since the last load)"""
+        with self.lock:
+            # Other processes (e.g. the cafe interface) append to the history too,
+            # so compare the file itself rather than tracking our own writes
+            signature = file_signature(Config.VOUCHER_HISTORY_CSV)
+            if signature is not None and signature == self.vouchers_signature:
+                return
+            
+            # Appends only ever make the file bigger. If it kept its size or shrank,
+            # an earlier row was edited in place (admins hand-edit it): start over
+            previous = self.vouchers_signature
+            grown = previous is not None and signature is not None and signature[1] > previous[1]
+            
+            self.vouchers_signature = signature
+            try:
+                with open(Config.VOUCHER_HISTORY_CSV, 'rb', buffering=HISTORY_READ_BUFFER) as f:
+                    # If the file grew and the last row we parsed is still where we
+                    # left it, everything after it is new. Otherwise the file was
+                    # cleared or rewritten: start over.
+                    f.seek(self.history_offset - len(self.history_last_row))
+                    if (not grown or not self.history_offset
+                            or f.read(len(self.history_last_row)) != self.history_last_row):
+                        self.reset_vouchers()
+                        f.seek(0)
+                    data = f.read()
+            except FileNotFoundError:
+                self.reset_vouchers()
+                return
+            except Exception as e:
+                print(f"Error loading vouchers: {e}")
+                self.vouchers_signature = None
+                return
+            
+            # Only complete lines move the read position on; a final row without
+            # a newline may still be being written, so it is re-read next time
+            end = data.rfind(b'\n') + 1
+            data, tail = data[:end], data[end:]
+            
+            try:
+                validity = timedelta(hours=Config.get_voucher_validity_hours())
+                if data:
+                    reader = csv.reader(StringIO(data.decode('utf-8'), newline=''))
+                    if self.history_fields is None:
+                        self.history_fields = next(reader)
+                    
+                    for values in reader:
+                        if values:
+                            self.apply_history_row_values(values, validity)
+                
+                # Hand-edited files often end without a newline, so still apply a
+                # trailing row once all of its fields are there
+                if tail and self.history_fields is not None:
+                    try:
+                        tail_text = tail.decode('utf-8')
+                    except UnicodeDecodeError:
+                        # A multi-byte character is only partly written so far
+                        tail_text = ''
+                    values = next(csv.reader(StringIO(tail_text, newline='')), [])
+                    if len(values) == len(self.history_fields):
+                        self.apply_history_row_values(values, validity)
+            except Exception as e:
+                print(f"Error loading vouchers: {e}")
+                self.reset_vouchers()
+                self.vouchers_signature = None
+                return
+            
+            if data:
+                self.history_offset += len(data)
+                self.history_last_row = data[data.rfind(b'\n', 0, -1) + 1:]
+    
+    def apply_history_row_values(self, values, validity):
+        """Apply one parsed history CSV row, skipping it if it is malformed"""
+        try:
+            self.apply_history_row(dict(zip(self.history_fields, values)), validity)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping invalid history row {values}: {e}")
+    
+    def apply_history_row(self, row, validity):
+        """Update the in-memory vouchers from one voucher history row"""
+        voucher_code = row['voucher_code']
+        status = row['status']
+        
+        if status == 'created':
+            # Create voucher entry from creation record
+            created_at = datetime.fromisoformat(row['timestamp'])
+            expires_at = created_at + validity
+            
+            previous = self.vouchers_db.get(voucher_code)
+            if previous and previous['redeemed']:
+                self.redeemed_count -= 1
+            
+            self.vouchers_db[voucher_code] = {
+                'employee_id': row['employee_id'],
+                'employee_name': row['employee_name'],
+                'created_at': row['timestamp'],
+                'expires_at': expires_at.isoformat(),
+                'redeemed': False,
+                'redeemed_at': None
+            }
+        elif status == 'redeemed' and voucher_code in self.vouchers_db:
+            # Update redemption status (this process may already have marked it)
+            voucher = self.vouchers_db[voucher_code]
+            if not voucher['redeemed']:
+                self.redeemed_count += 1
+            voucher['redeemed'] = True
+            voucher['redeemed_at'] = row['timestamp']
+    
+    def get_employees(self):
+        """Get all employees"""
+        return self.employees_cache
+    
+    def get_employee_by_id(self, employee_id):
+        """Get a single employee by ID, or None"""
+        return self.employees_by_id.get(employee_id)
+    
+    def get_birthday_today(self):
+        """Get employees with birthday today"""
+        # Cheap when employees.csv is unchanged, so callers never need refresh_data()
+        self.load_employees()
+        today = datetime.now()
+        return list(self.birthdays_by_day.get(today.strftime('%m-%d'), []))
     
     def generate_secure_code(self, employee_id, date_of_birth):
         """Generate secure voucher code using UUID like your system"""
@@ -112,49 +257,93 @@ class VoucherDatabase:
     
     def create_voucher(self, employee_id, employee_name):
         """Create a voucher with secure code"""
-        # Reload vouchers to ensure we have latest data
-        self.load_vouchers_from_csv()
-        
-        # Check if employee already has an active voucher
-        for code, voucher in self.vouchers_db.items():
-            if voucher['employee_id'] == employee_id and not voucher['redeemed']:
-                # Employee already has an active voucher, return existing code
-                return code
-        
-        # Get employee's date of birth
-        employee = None
-        for emp in self.employees_cache:
-            if emp['employee_id'] == employee_id:
-                employee = emp
-                break
-        
-        if not employee:
-            raise ValueError(f"Employee {employee_id} not found")
-        
-        date_of_birth = employee.get('date_of_birth', '')
-        
-        # Generate unique secure code based on ID and date of birth
-        voucher_code = self.generate_secure_code(employee_id, date_of_birth)
-        
-        created_at = datetime.now()
-        expires_at = created_at + timedelta(hours=Config.get_voucher_validity_hours())
+        created, failed = self.create_vouchers([
+            {'employee_id': employee_id, 'employee_name': employee_name}
+        ])
+        if failed:
+            raise failed[0][1]
+        return created[0][1]
+    
+    def create_vouchers(self, employees):
+        """Create vouchers for several employees with a single history write
+        
+        Returns (created, failed): lists of (employee, voucher_code) and
+        (employee, error) pairs, in the order the employees were given
+        """
+        with self.lock:
+            # Reload vouchers to ensure we have latest data
+            self.load_vouchers_from_csv()
+            
+            # Employees that already have an active voucher keep their existing code
+            active_codes = {}
+            for code, voucher in self.vouchers_db.items():
+                if not voucher['redeemed']:
+                    active_codes.setdefault(voucher['employee_id'], code)
+            
+            created, failed, history_rows = [], [], []
+            for employee in employees:
+                employee_id = employee['employee_id']
+                employee_name = employee['employee_name']
+                
+                if employee_id in active_codes:
+                    created.append((employee, active_codes[employee_id]))
+                    continue
+                
+                # Get employee's date of birth
+                record = self.get_employee_by_id(employee_id)
+                if not record:
+                    failed.append((employee, ValueError(f"Employee {employee_id} not found")))
+                    continue
+                
+                date_of_birth = record.get('date_of_birth', '')
+                
+                # Generate unique secure code based on ID and date of birth
+                voucher_code = self.generate_secure_code(employee_id, date_of_birth)
+                
+                created_at = datetime.now()
+                expires_at = created_at + timedelta(hours=Config.get_voucher_validity_hours())
+                
+                self.vouchers_db[voucher_code] = {
+                    'employee_id': employee_id,
+                    'employee_name': employee_name,
+                    'created_at': created_at.isoformat(),
+                    'expires_at': expires_at.isoformat(),
+                    'redeemed': False,
+                    'redeemed_at': None
+                }
+                active_codes[employee_id] = voucher_code
+                created.append((employee, voucher_code))
+                history_rows.append([created_at.isoformat(), voucher_code, employee_id,
+                                     employee_name, 'created'])
+            
+            # Save to history
+            if history_rows:
+                self.save_history_rows(history_rows)
+            
+            return created, failed
+    
+    def prepare_birthday_vouchers(self, employees):
+        """Create birthday vouchers and pre-render the QR codes that will be sent
         
-        self.vouchers_db[voucher_code] = {
-            'employee_id': employee_id,
-            'employee_name': employee_name,
-            'created_at': created_at.isoformat(),
-            'expires_at': expires_at.isoformat(),
-            'redeemed': False,
-            'redeemed_at': None
-        }
+        Returns (created, failed) like create_vouchers(), with failures already logged
+        """
+        created, failed = self.create_vouchers(employees)
+        for employee, error in failed:
+            print(f"Error creating voucher for {employee['employee_name']}: {error}")
         
-        # Save to history
-        self.save_voucher_to_history(voucher_code, employee_id, employee_name, 'created')
+        # Only UltraMsg sends the QR image, other services just send the code.
+        # Generate all QR codes up front, before any message goes out
+        if Config.MESSAGING_SERVICE == 'ultramsg':
+            self.generate_qr_codes([voucher_code for _, voucher_code in created])
         
-        return voucher_code
+        return created, failed
     
     def check_voucher_status(self, voucher_code):
         """Check if voucher is valid and active"""
+        # A malformed code can't be in the history, so don't reload it
+        if not is_voucher_code(voucher_code):
+            return False, 'Voucher not found'
+        
         # Reload vouchers to ensure we have latest data
         self.load_vouchers_from_csv()
         
@@ -176,116 +365,143 @@ class VoucherDatabase:
     
     def redeem_voucher(self, voucher_code):
         """Redeem a voucher with proper validation"""
-        # First check voucher status
-        is_valid, message = self.check_voucher_status(voucher_code)
-        if not is_valid:
-            return False, message
-        
-        voucher = self.vouchers_db[voucher_code]
-        
-        # Mark as redeemed
-        voucher['redeemed'] = True
-        voucher['redeemed_at'] = datetime.now().isoformat()
-        
-        # Save to history
-        self.save_voucher_to_history(voucher_code, voucher['employee_id'], voucher['employee_name'], 'redeemed')
-        
-        # Clean up QR image after redemption
-        self.cleanup_qr_images(voucher_code)
-        
-        return True, voucher
+        with self.lock:
+            # First check voucher status
+            is_valid, message = self.check_voucher_status(voucher_code)
+            if not is_valid:
+                return False, message
+            
+            voucher = self.vouchers_db[voucher_code]
+            
+            # Mark as redeemed
+            voucher['redeemed'] = True
+            voucher['redeemed_at'] = datetime.now().isoformat()
+            self.redeemed_count += 1
+            
+            # Save to history
+            self.save_voucher_to_history(voucher_code, voucher['employee_id'], voucher['employee_name'], 'redeemed')
+            
+            # Clean up QR image after redemption
+            self.cleanup_qr_images(voucher_code)
+            
+            return True, voucher
     
     def get_all_vouchers(self):
         """Get all vouchers"""
-        # Reload vouchers to ensure we have latest data
-        self.load_vouchers_from_csv()
-        return self.vouchers_db
+        # Reload vouchers to ensure we have latest data, and hand out a copy
+        # so callers can iterate it while other threads add vouchers
+        with self.lock:
+            self.load_vouchers_from_csv()
+            return dict(self.vouchers_db)
     
-    def get_voucher_history(self):
-        """Get voucher history from CSV"""
-        history = []
+    def get_voucher_counts(self):
+        """Get (active, redeemed) voucher counts"""
+        with self.lock:
+            self.load_vouchers_from_csv()
+            return len(self.vouchers_db) - self.redeemed_count, self.redeemed_count
+    
+    def iter_voucher_history(self):
+        """Yield voucher history rows from CSV one at a time"""
         try:
-            with open(Config.VOUCHER_HISTORY_CSV, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    history.append(row)
+            with open(Config.VOUCHER_HISTORY_CSV, 'r', encoding='utf-8', newline='',
+                      buffering=HISTORY_READ_BUFFER) as f:
+                yield from csv.DictReader(f)
         except FileNotFoundError:
             pass
         except Exception as e:
             print(f"Error loading history: {e}")
-        return history
+    
+    def get_voucher_history(self):
+        """Get voucher history from CSV"""
+        return list(self.iter_voucher_history())
     
     def save_voucher_to_history(self, voucher_code, employee_id, employee_name, status):
         """Save voucher action to history"""
+        self.save_history_rows([[
+            datetime.now().isoformat(),
+            voucher_code,
+            employee_id,
+            employee_name,
+            status
+        ]])
+    
+    def save_history_rows(self, rows):
+        """Append several [timestamp, code, employee_id, employee_name, status] rows to history"""
         try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(Config.VOUCHER_HISTORY_CSV), exist_ok=True)
             
-            # Check if file exists and has headers
-            file_exists = os.path.exists(Config.VOUCHER_HISTORY_CSV)
-            
-            # Use a more robust approach - read existing data, append new row, write back
-            existing_data = []
-            if file_exists:
-                try:
-                    with open(Config.VOUCHER_HISTORY_CSV, 'r', encoding='utf-8', newline='') as f:
-                        reader = csv.reader(f)
-                        existing_data = list(reader)
-                except Exception as e:
-                    print(f"Error reading existing history: {e}")
-                    existing_data = []
+            # Only a missing or empty file needs the header row
+            needs_header = (not os.path.exists(Config.VOUCHER_HISTORY_CSV)
+                            or os.path.getsize(Config.VOUCHER_HISTORY_CSV) == 0)
             
-            # Add new row
-            new_row = [
-                datetime.now().isoformat(),
-                voucher_code,
-                employee_id,
-                employee_name,
-                status
-            ]
+            # A hand-edited history may not end with a newline, and appending
+            # straight after it would merge our first row into its last one
+            needs_newline = False
+            if not needs_header:
+                with open(Config.VOUCHER_HISTORY_CSV, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b'\n'
             
-            # If file doesn't exist or is empty, add header
-            if not file_exists or len(existing_data) == 0:
-                existing_data = [['timestamp', 'voucher_code', 'employee_id', 'employee_name', 'status']]
+            # Append instead of reading the whole history back into memory
+            with open(Config.VOUCHER_HISTORY_CSV, 'a', encoding='utf-8', newline='') as f:
+                if needs_header:
+                    f.write(HISTORY_HEADER)
+                elif needs_newline:
+                    f.write('\r\n')
+                csv.writer(f).writerows(rows)
             
-            existing_data.append(new_row)
-            
-            # Write all data back to file
-            with open(Config.VOUCHER_HISTORY_CSV, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerows(existing_data)
-                
-            print(f"[HISTORY] Saved {status} for voucher {voucher_code}")
+            for row in rows:
+                print(f"[HISTORY] Saved {row[4]} for voucher {row[1]}")
         except Exception as e:
             print(f"Error saving to history: {e}")
     
     def generate_qr_code(self, voucher_code):
         """Generate QR code for voucher and save to file"""
-        # Import QR system functions
-        from qr_system import create_qr_code
+        # Voucher codes never change, so reuse the image if we already built it
+        if voucher_code in self.qr_cache:
+            return self.qr_cache[voucher_code]
         
-        # Create and save QR code image
-        qr_filename = create_qr_code(voucher_code)
+        return self.store_qr_code(voucher_code, render_qr_png(voucher_code))
+    
+    def generate_qr_codes(self, voucher_codes):
+        """Generate QR codes for several vouchers"""
+        # A render takes about a millisecond, far less than starting a worker
+        # pool would, so cache misses are simply rendered here one by one
+        return {code: self.generate_qr_code(code) for code in voucher_codes}
+    
+    def store_qr_code(self, voucher_code, png_bytes):
+        """Save rendered QR code PNG to file and cache its base64 data URI"""
+        # Save the QR code image
+        os.makedirs(Config.QRCODES_DIR, exist_ok=True)
+        qr_path = os.path.join(Config.QRCODES_DIR, f"{voucher_code}.png")
+        with open(qr_path, 'wb') as f:
+            f.write(png_bytes)
+        print(f"[+] QR saved: {qr_path}")
         
         # Also create base64 for web display
-        img = qrcode.make(voucher_code)
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
+        img_base64 = base64.b64encode(png_bytes).decode()
+        qr_data_uri = f"data:image/png;base64,{img_base64}"
         
-        return f"data:image/png;base64,{img_base64}"
+        # Drop the oldest entry once the cache is full
+        if len(self.qr_cache) >= QR_CACHE_SIZE:
+            self.qr_cache.pop(next(iter(self.qr_cache)), None)
+        self.qr_cache[voucher_code] = qr_data_uri
+        
+        return qr_data_uri
     
     def clear_voucher_history(self):
         """Clear voucher history (for testing)"""
-        try:
-            with open(Config.VOUCHER_HISTORY_CSV, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['timestamp', 'voucher_code', 'employee_id', 'employee_name', 'status'])
-        except Exception as e:
-            print(f"Error clearing history: {e}")
+        with self.lock:
+            try:
+                with open(Config.VOUCHER_HISTORY_CSV, 'w', newline='', encoding='utf-8') as f:
+                    f.write(HISTORY_HEADER)
+            except Exception as e:
+                print(f"Error clearing history: {e}")
     
     def cleanup_qr_images(self, voucher_code):
         """Clean up QR image file if voucher is redeemed or expired"""
+        self.qr_cache.pop(voucher_code, None)
         try:
             qr_path = os.path.join(Config.QRCODES_DIR, f"{voucher_code}.png")
             if os.path.exists(qr_path):
@@ -296,13 +512,13 @@ class VoucherDatabase:
     
     def cleanup_expired_vouchers(self):
         """Clean up expired vouchers and their QR images"""
-        from datetime import datetime
+        now = datetime.now()
         
         expired_codes = []
         for code, voucher in self.vouchers_db.items():
             try:
                 expires_at = datetime.fromisoformat(voucher['expires_at'])
-                if datetime.now() > expires_at and not voucher['redeemed']:
+                if now > expires_at and not voucher['redeemed']:
                     expired_codes.append(code)
             except:
                 continue
@@ -353,8 +569,8 @@ class VoucherDatabase:
         """Get system statistics"""
         self.load_all_data()
         
-        active_vouchers = sum(1 for v in self.vouchers_db.values() if not v['redeemed'])
         total_vouchers = len(self.vouchers_db)
+        active_vouchers = total_vouchers - self.redeemed_count
         
         # Get fresh birthday count
         birthdays_today = self.get_birthday_today()
@@ -376,7 +592,10 @@ db = VoucherDatabase()
 
 # Convenience functions for backward compatibility
 def load_employees():
-    return db.get_employees()
+    return db.load_employees()
+
+def get_employee_by_id(employee_id):
+    return db.get_employee_by_id(employee_id)
 
 def get_birthday_today():
     return db.get_birthday_today()
@@ -384,6 +603,12 @@ def get_birthday_today():
 def create_voucher(employee_id, employee_name):
     return db.create_voucher(employee_id, employee_name)
 
+def create_vouchers(employees):
+    return db.create_vouchers(employees)
+
+def prepare_birthday_vouchers(employees):
+    return db.prepare_birthday_vouchers(employees)
+
 def redeem_voucher(voucher_code):
     return db.redeem_voucher(voucher_code)
 
@@ -399,12 +624,24 @@ def cleanup_expired_vouchers():
 def get_all_vouchers():
     return db.get_all_vouchers()
 
+def get_voucher_counts():
+    return db.get_voucher_counts()
+
 def get_voucher_history():
     return db.get_voucher_history()
 
+def iter_voucher_history():
+    return db.iter_voucher_history()
+
 def generate_qr_code(voucher_code):
     return db.generate_qr_code(voucher_code)
 
+def generate_qr_codes(voucher_codes):
+    return db.generate_qr_codes(voucher_codes)
+
+def store_qr_code(voucher_code, png_bytes):
+    return db.store_qr_code(voucher_code, png_bytes)
+
 def clear_voucher_history():
     return db.clear_voucher_history()
 
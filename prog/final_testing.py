@@ -7,16 +7,18 @@ This script runs the complete birthday voucher system with WhatsApp messaging
 import os
 import sys
 import time
-import threading
+import socket
 import subprocess
-from datetime import datetime
 
 # Add the prog directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import Config
-from database import get_birthday_today, create_voucher, generate_qr_code
-from whatsapp_service import send_whatsapp_message
+from database import get_birthday_today, prepare_birthday_vouchers
+from whatsapp_service import send_whatsapp_messages
+
+# Seconds to wait for each server to start accepting connections
+SERVER_START_TIMEOUT = 15
 
 def print_header():
     """Print the program header"""
@@ -48,50 +50,60 @@ def print_warning(message):
     """Print warning message"""
     print(f"[WARNING] {message}")
 
+def wait_for_server(port, timeout=SERVER_START_TIMEOUT):
+    """Wait until a local server accepts connections, return False on timeout"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('localhost', port), timeout=0.25):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
 def start_servers():
     """Start all required servers"""
     print_info("Starting all servers...")
+    prog_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Start main server
+    # The servers don't depend on each other, so launch them all
+    # and wait once instead of once per server
     print_info("Starting main server (port 5000)...")
     main_server = subprocess.Popen([
         sys.executable, "app.py"
-    ], cwd=os.path.dirname(os.path.abspath(__file__)))
+    ], cwd=prog_dir)
     
-    time.sleep(2)  # Give server time to start
-    
-    # Start cafe interface
     print_info("Starting cafe interface (port 5001)...")
     cafe_server = subprocess.Popen([
         sys.executable, "cafe_interface.py"
-    ], cwd=os.path.dirname(os.path.abspath(__file__)))
-    
-    time.sleep(2)  # Give server time to start
+    ], cwd=prog_dir)
     
-    # Start admin interface
     print_info("Starting admin interface (port 5002)...")
     admin_server = subprocess.Popen([
         sys.executable, "admin_interface.py"
-    ], cwd=os.path.dirname(os.path.abspath(__file__)))
+    ], cwd=prog_dir)
     
-    time.sleep(2)  # Give server time to start
-    
-    print_success("All servers started successfully!")
+    return main_server, cafe_server, admin_server
+
+def wait_for_servers():
+    """Wait for the servers launched by start_servers() to accept connections"""
+    # Poll until each server accepts connections instead of a fixed sleep
+    not_ready = [port for port in (Config.PORT, Config.CAFE_PORT, Config.ADMIN_PORT)
+                 if not wait_for_server(port)]
+    if not_ready:
+        print_warning(f"No response on port(s) {', '.join(map(str, not_ready))} "
+                      f"after {SERVER_START_TIMEOUT}s, servers may still be starting")
+    else:
+        print_success("All servers started successfully!")
     print_info("Web interfaces available at:")
     print_info("  - Main Server: http://localhost:5000")
     print_info("  - Cafe Interface: http://localhost:5001")
     print_info("  - Admin Interface: http://localhost:5002")
-    
-    return main_server, cafe_server, admin_server
 
 def send_birthday_messages():
     """Send birthday messages to employees with birthdays today"""
     print_info("Checking for employees with birthdays today...")
     
-    # Force refresh data to ensure we have latest employee data
-    from database import refresh_data
-    refresh_data()
-    
     birthdays = get_birthday_today()
     
     if not birthdays:
@@ -102,49 +114,37 @@ def send_birthday_messages():
     print()
     
     results = []
-    for employee in birthdays:
-        try:
-            print_info(f"Processing birthday for {employee['employee_name']} ({employee['employee_id']})")
-            
-            # Create voucher
-            voucher_code = create_voucher(employee['employee_id'], employee['employee_name'])
-            print_success(f"Created voucher: {voucher_code}")
-            
-            # Generate QR code
-            qr_code = generate_qr_code(voucher_code)
-            print_success(f"Generated QR code: {voucher_code}.png")
-            
-            # Send WhatsApp message
-            print_info(f"Sending WhatsApp message to {employee['phone_number']}...")
-            success = send_whatsapp_message(
-                employee['phone_number'],
-                employee['employee_name'],
-                voucher_code
-            )
-            
-            if success:
-                print_success(f"WhatsApp message sent to {employee['employee_name']}")
-                results.append({
-                    'employee_name': employee['employee_name'],
-                    'voucher_code': voucher_code,
-                    'message_sent': True
-                })
-            else:
-                print_error(f"Failed to send WhatsApp message to {employee['employee_name']}")
-                results.append({
-                    'employee_name': employee['employee_name'],
-                    'voucher_code': voucher_code,
-                    'message_sent': False
-                })
-            
-            print()
-            
-        except Exception as e:
-            print_error(f"Error processing {employee['employee_name']}: {e}")
-            results.append({
-                'employee_name': employee['employee_name'],
-                'error': str(e)
-            })
+    
+    created, failed = prepare_birthday_vouchers(birthdays)
+    for employee, voucher_code in created:
+        print_success(f"Created voucher for {employee['employee_name']} ({employee['employee_id']}): {voucher_code}")
+    
+    for employee, error in failed:
+        results.append({
+            'employee_name': employee['employee_name'],
+            'error': str(error)
+        })
+    
+    print()
+    
+    # Send WhatsApp messages in parallel, reporting each as it finishes
+    recipients = [(employee['phone_number'], employee['employee_name'], voucher_code)
+                  for employee, voucher_code in created]
+    for phone, _, _ in recipients:
+        print_info(f"Sending WhatsApp message to {phone}...")
+    
+    for (_, employee_name, voucher_code), success in send_whatsapp_messages(recipients):
+        if success:
+            print_success(f"WhatsApp message sent to {employee_name}")
+        else:
+            print_error(f"Failed to send WhatsApp message to {employee_name}")
+        results.append({
+            'employee_name': employee_name,
+            'voucher_code': voucher_code,
+            'message_sent': success
+        })
+    
+    print()
     
     return results
 
@@ -177,45 +177,49 @@ def print_results_summary(results):
     
     print("=" * 60)
 
+def stop_servers(servers):
+    """Terminate the server processes and wait for them to exit"""
+    for server in servers:
+        server.terminate()
+    for server in servers:
+        server.wait()
+
 def main():
     """Main function"""
     try:
         # Print header
         print_header()
         
-        # Send birthday messages
-        print_info("Starting birthday message processing...")
-        results = send_birthday_messages()
-        
-        # Print results summary
-        print_results_summary(results)
+        # Start servers first so they boot while birthday messages are sent
+        servers = start_servers()
         
-        # Start servers
-        main_server, cafe_server, admin_server = start_servers()
-        
-        print()
-        print_info("🎉 Full system is now running!")
-        print_info("You can now visit the web interfaces to test the system.")
-        print_info("Press Ctrl+C to stop all servers.")
-        print()
-        
-        # Keep the program running
+        # Whatever happens from here on (including Ctrl+C during a slow,
+        # rate-limited send), don't leave the servers running on their ports
         try:
+            # Send birthday messages
+            print_info("Starting birthday message processing...")
+            results = send_birthday_messages()
+            
+            # Print results summary
+            print_results_summary(results)
+            
+            wait_for_servers()
+            
+            print()
+            print_info("🎉 Full system is now running!")
+            print_info("You can now visit the web interfaces to test the system.")
+            print_info("Press Ctrl+C to stop all servers.")
+            print()
+            
+            # Keep the program running
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
             print()
+        finally:
             print_info("Shutting down servers...")
             
-            # Terminate servers
-            main_server.terminate()
-            cafe_server.terminate()
-            admin_server.terminate()
-            
-            # Wait for servers to close
-            main_server.wait()
-            cafe_server.wait()
-            admin_server.wait()
+            stop_servers(servers)
             
             print_success("All servers stopped. Goodbye!")
             
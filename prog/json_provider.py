@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Optional orjson-backed JSON provider for BDVoucher Flask apps
+Falls back to Flask's default JSON handling when orjson is not installed
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        # orjson output is always compact; pretty-printed debug output and
+        # other custom options go through Flask
+        if kwargs and kwargs != {'separators': (',', ':')}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+def use_orjson(app):
+    """Switch the app to orjson for JSON responses when it is available"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    return app.json
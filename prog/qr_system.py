@@ -11,6 +11,9 @@ from config import Config
 
 SAVE_DIR = Config.QRCODES_DIR
 NUM_VOUCHERS = 5  # Change how many vouchers to generate
+# Fixed QR mask pattern (0-7). Any mask is valid; fixing it skips trying all
+# eight to find the lowest-penalty one, which is most of the encoding time.
+QR_MASK_PATTERN = 0
 
 # Ensure the save directory exists
 os.makedirs(SAVE_DIR, exist_ok=True)
@@ -22,15 +25,20 @@ def generate_voucher_code():
     """Generate a unique alphanumeric voucher code."""
     return str(uuid.uuid4()).replace("-", "").upper()[:12]
 
-def create_qr_code(voucher_code):
-    """Create a QR code for a voucher and save it to file."""
+def build_qr_image(voucher_code):
+    """Build the QR code image for a voucher code."""
     qr = qrcode.QRCode(
         version=1, box_size=10, border=4,
-        error_correction=qrcode.constants.ERROR_CORRECT_L
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        mask_pattern=QR_MASK_PATTERN
     )
     qr.add_data(voucher_code)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    return qr.make_image(fill_color="black", back_color="white")
+
+def create_qr_code(voucher_code):
+    """Create a QR code for a voucher and save it to file."""
+    img = build_qr_image(voucher_code)
 
     file_path = os.path.join(SAVE_DIR, f"{voucher_code}.png")
     img.save(file_path)
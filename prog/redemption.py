@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Shared voucher redemption endpoint for BDVoucher interfaces
+Registered by both the main application and the cafe interface
+"""
+from flask import Blueprint, request, jsonify
+from database import redeem_voucher
+
+redemption = Blueprint('redemption', __name__)
+
+@redemption.route('/redeem', methods=['POST'])
+def redeem():
+    """Redeem a voucher"""
+    data = request.get_json(silent=True) or {}
+    code = data.get('code', '')
+    
+    success, result = redeem_voucher(code)
+    
+    if success:
+        return jsonify({
+            'success': True,
+            'employee_name': result['employee_name'],
+            'message': 'Voucher redeemed successfully!'
+        })
+    else:
+        return jsonify({
+            'success': False,
+            'message': result
+        })
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Precompressed page views for BDVoucher interfaces
+Used by both the main application and the admin interface for their dashboards
+"""
+import gzip
+import hashlib
+from flask import Response, request
+
+def precompressed_page(html):
+    """Build a view serving a fixed HTML page, gzipped when accepted and with ETag/304 support"""
+    # The page never changes while the app runs, so hash and compress it once
+    body = html.encode('utf-8')
+    body_etag = hashlib.sha1(body).hexdigest()
+    gzipped_body = gzip.compress(body)
+    
+    def page():
+        # The compressed body is a different representation, so give it its own ETag
+        gzipped = 'gzip' in request.accept_encodings
+        etag = f"{body_etag}-gzip" if gzipped else body_etag
+        
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        elif gzipped:
+            response = Response(gzipped_body, mimetype='text/html')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(body, mimetype='text/html')
+        
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        return response
+    
+    return page
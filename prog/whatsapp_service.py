@@ -3,10 +3,44 @@
 WhatsApp messaging service for BDVoucher
 """
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import Config
 
+# Maximum number of messages sent at the same time
+SEND_WORKERS = 8
+
+# Seconds to wait for the messaging API before giving up on a send
+SEND_TIMEOUT = 30
+
+# One pooled session so consecutive messages reuse the API connection,
+# sized so every parallel send worker can keep its connection alive
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=SEND_WORKERS))
+
+class SendRateLimiter:
+    """Spaces sends at least `interval` seconds apart, across threads"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_send_at = 0.0
+    
+    def wait(self):
+        """Block only for whatever is left of the interval since the last send"""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_send_at - now
+            self.next_send_at = max(now, self.next_send_at) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+# TextMeBot is rate limited, so all TextMeBot sends in this process share one limiter
+textmebot_limiter = SendRateLimiter(Config.TEXTMEBOT_SEND_INTERVAL)
+
 def send_whatsapp_message(phone, employee_name, voucher_code, custom_message=None):
     """Send WhatsApp message with optional custom message"""
     try:
@@ -26,7 +60,8 @@ def send_whatsapp_message(phone, employee_name, voucher_code, custom_message=Non
                 f"&text={encoded_text}"
             )
 
-            response = requests.get(url)
+            textmebot_limiter.wait()
+            response = session.get(url, timeout=SEND_TIMEOUT)
             if response.status_code == 200:
                 if "success" in response.text.lower():
                     print("✅ Message sent successfully via TextMeBot.")
@@ -35,7 +70,6 @@ def send_whatsapp_message(phone, employee_name, voucher_code, custom_message=Non
                     print(f"⚠️ TextMeBot response: {response.text}")
             else:
                 print(f"❌ TextMeBot API error: {response.status_code}")
-            time.sleep(10)
 
         # fallback to UltraMsg for image support
         elif Config.MESSAGING_SERVICE == 'ultramsg':
@@ -48,7 +82,7 @@ def send_whatsapp_message(phone, employee_name, voucher_code, custom_message=Non
                 "caption": message_text,
                 "token": Config.ULTRAMSG_TOKEN
             }
-            response = requests.post(url, data=payload)
+            response = session.post(url, data=payload, timeout=SEND_TIMEOUT)
             if response.status_code == 200:
                 result = response.json()
                 if result.get("sent"):
@@ -64,3 +98,13 @@ def send_whatsapp_message(phone, employee_name, voucher_code, custom_message=Non
         print(f"💥 Error sending message: {e}")
         return False
 
+def send_whatsapp_messages(recipients):
+    """Send messages to several (phone, employee_name, voucher_code) recipients,
+    yielding (recipient, success) as each send finishes"""
+    # TextMeBot is rate limited, so only send in parallel for other services
+    workers = 1 if Config.MESSAGING_SERVICE == 'textmebot' else SEND_WORKERS
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sends = {executor.submit(send_whatsapp_message, *recipient): recipient
+                 for recipient in recipients}
+        for send in as_completed(sends):
+            yield sends[send], send.result()